@@ -13,16 +13,12 @@ import streamlit as st
 import yaml
 import os
 import random
-import json
+import copy
+import orjson
 import re
+from functools import lru_cache
 from pathlib import Path
-import snowflake.connector
-from ellie import (
-    snowflake_connect,
-    snowflake_export,
-    ellie_connect,
-    ellie_model_import
-)
+from ellie import ellie_connect
 
 # Set page config
 st.set_page_config(
@@ -32,22 +28,44 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'connected_to_snowflake' not in st.session_state:
-    st.session_state.connected_to_snowflake = False
-if 'connected_to_ellie' not in st.session_state:
-    st.session_state.connected_to_ellie = False
+st.session_state.setdefault('connected_to_snowflake', False)
+st.session_state.setdefault('connected_to_ellie', False)
+
+CONFIG_PATH = Path("config/default_config.yaml")
+
+# Matches full Snowflake URLs and captures the account identifier
+_ACCOUNT_URL_RE = re.compile(r'https?://([^.]+\.[^.]+\.[^.]+)\.snowflakecomputing\.com')
+
+# URL schemes accepted for the Ellie organization
+_SCHEMES = ('http://', 'https://')
 
-def load_config():
+# Largest request payload (in bytes) shown inline in debug mode
+DEBUG_PAYLOAD_MAX_BYTES = 200_000
+
+# Seconds to wait for the Snowflake login handshake before giving up
+SNOWFLAKE_LOGIN_TIMEOUT = 30
+
+@st.cache_data(show_spinner=False)
+def load_config(mtime):
     """
     Load configuration from the default config file.
     
+    The parsed result is cached across reruns. The file's modification time is
+    part of the cache key, so the file is only re-parsed after it changes.
+    
+    Args:
+        mtime (float): Modification time of the config file (0 if it does not exist)
+    
     Returns:
         dict: Configuration dictionary with Snowflake and Ellie settings
     """
-    config_path = Path("config/default_config.yaml")
+    config_path = CONFIG_PATH
     if config_path.exists():
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        # Prefer the libyaml-backed loader, falling back to the pure-Python one
+        Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        # Read the whole file in one go; the loader accepts bytes directly
+        data = config_path.read_bytes()
+        return yaml.load(data, Loader=Loader)
     return {
         'snowflake': {
             'account': '', 'user': '', 'password': '',
@@ -65,13 +83,25 @@ def save_config(config):
     """
     Save configuration to the default config file.
     
+    The file is only rewritten when the configuration differs from the one
+    that was loaded at the start of this run.
+    
     Args:
         config (dict): Configuration dictionary to save
+        
+    Returns:
+        bool: True if the file was written, False if there was nothing to save
     """
+    if config == st.session_state.get('_config_snapshot'):
+        return False
+    
     os.makedirs('config', exist_ok=True)
     with open('config/default_config.yaml', 'w') as f:
-        yaml.dump(config, f)
+        yaml.dump(config, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper))
+    st.session_state['_config_snapshot'] = copy.deepcopy(config)
+    return True
 
+@lru_cache(maxsize=64)
 def extract_account_from_url(url):
     """
     Extract the account identifier from a Snowflake URL.
@@ -82,18 +112,85 @@ def extract_account_from_url(url):
     Returns:
         str: Account identifier (e.g., nn73358.eu-north-1.aws)
     """
-    # First, check if it's a URL format
-    url_pattern = r'https?://([^\.]+\.[^\.]+\.[^\.]+)\.snowflakecomputing\.com'
-    match = re.match(url_pattern, url)
+    # Bare account IDs don't need the regex at all
+    if '://' not in url:
+        return url
+    
+    # Otherwise, check if it's a Snowflake URL
+    match = _ACCOUNT_URL_RE.match(url)
     if match:
         return match.group(1)
     
     # If not a URL format, return as is (could be just the account ID)
     return url
 
+@st.cache_resource(show_spinner=False, validate=lambda conn: not conn.is_closed())
+def _get_snow_conn(cfg_hashable):
+    """
+    Open a Snowflake connection that is shared across Streamlit reruns.
+    
+    Streamlit caches the returned connection, so the login handshake only happens
+    once for each distinct set of connection settings. Failed connections raise
+    and are therefore not cached, and a cached connection that has been closed
+    (network drop, expired session) is replaced by a new one.
+    
+    Args:
+        cfg_hashable (tuple): Sorted (key, value) pairs of the Snowflake settings
+        
+    Returns:
+        snowflake.connector.connection.SnowflakeConnection: Snowflake connection object
+    """
+    # Imported here because the connector is slow to import and only needed once connecting
+    import snowflake.connector
+    
+    settings = dict(cfg_hashable)
+    
+    # If using a custom URL for privatelink, use that instead of the account
+    if settings.get('connection_mode') == 'privatelink' and settings.get('custom_url'):
+        # For privatelink connections, use the custom URL
+        account_param = settings['custom_url']
+    else:
+        # For standard connections, use the account (which might be a full URL)
+        account_param = extract_account_from_url(settings['account'])
+    
+    return snowflake.connector.connect(
+        account=account_param,
+        user=settings['user'],
+        password=settings['password'],
+        warehouse=settings['warehouse'],
+        database=settings['database'],
+        role=settings['role'],
+        login_timeout=SNOWFLAKE_LOGIN_TIMEOUT,
+        client_session_keep_alive=True
+    )
+
+def _ensure_https(url):
+    """
+    Add an https:// prefix to a URL that has no scheme.
+    
+    Args:
+        url (str): URL, possibly without scheme (e.g., your-org.ellie.ai)
+        
+    Returns:
+        str: URL with a scheme, or the input unchanged if it is empty or already has one
+    """
+    return url if (not url or url.startswith(_SCHEMES)) else 'https://' + url
+
+def _settings_key(settings):
+    """
+    Hashable cache key for a set of Snowflake settings.
+    
+    Args:
+        settings (dict): Snowflake connection settings
+        
+    Returns:
+        tuple: Sorted (key, value) pairs of the settings
+    """
+    return tuple(sorted(settings.items()))
+
 def connect_to_snowflake(settings):
     """
-    Establish a connection to Snowflake using the provided settings.
+    Get a (cached) connection to Snowflake using the provided settings.
     
     Args:
         settings (dict): Snowflake connection settings
@@ -102,35 +199,36 @@ def connect_to_snowflake(settings):
         snowflake.connector.connection.SnowflakeConnection or None: Snowflake connection object or None if connection fails
     """
     try:
-        # If using a custom URL for privatelink, use that instead of the account
-        if settings.get('connection_mode') == 'privatelink' and settings.get('custom_url'):
-            # For privatelink connections, use the custom URL
-            conn = snowflake.connector.connect(
-                account=settings['custom_url'],
-                user=settings['user'],
-                password=settings['password'],
-                warehouse=settings['warehouse'],
-                database=settings['database'],
-                role=settings['role']
-            )
-        else:
-            # For standard connections, use the account (which might be a full URL)
-            account_param = extract_account_from_url(settings['account'])
-            conn = snowflake.connector.connect(
-                account=account_param,
-                user=settings['user'],
-                password=settings['password'],
-                warehouse=settings['warehouse'],
-                database=settings['database'],
-                role=settings['role']
-            )
-        return conn
+        return _get_snow_conn(_settings_key(settings))
     except Exception as e:
         st.error(f"Failed to connect to Snowflake: {str(e)}")
         return None
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _list_schemas(_conn, cfg_hashable):
+    """
+    List the schemas visible with the given connection settings.
+    
+    The result is cached for a few minutes so that reruns triggered by other
+    widgets don't issue a new SHOW SCHEMAS query. The cache is shared by all
+    sessions, so it is keyed by the full settings (account, user, database,
+    role, ...) rather than only the database and role.
+    
+    Args:
+        _conn (SnowflakeConnection): Cached Snowflake connection (not part of the cache key)
+        cfg_hashable (tuple): Sorted (key, value) pairs of the Snowflake settings
+        
+    Returns:
+        list: Schema names
+    """
+    # TERSE returns only the basic columns; only the name (column 1) is needed here
+    with _conn.cursor() as cur:
+        cur.execute("SHOW TERSE SCHEMAS")
+        return [row[1] for row in cur]
+
 # Load existing config
-config = load_config()
+config = load_config(CONFIG_PATH.stat().st_mtime if CONFIG_PATH.exists() else 0)
+st.session_state['_config_snapshot'] = copy.deepcopy(config)
 
 # Main UI
 st.title("❄️ Snowflake to Ellie Transfer")
@@ -151,7 +249,10 @@ with st.sidebar:
         help="Standard: Regular Snowflake account. PrivateLink: Use privatelink with VPN/private network."
     )
     snowflake_config['connection_mode'] = connection_mode.lower()
-    
+
+# The remaining settings are submitted together, so typing doesn't trigger a rerun per keystroke.
+# The connection mode radio stays outside the form because it switches the fields shown below.
+with st.sidebar.form('settings_form'):
     # Show appropriate fields based on connection mode
     if connection_mode == "Standard":
         snowflake_config['account'] = st.text_input(
@@ -177,20 +278,19 @@ with st.sidebar:
     st.subheader("Ellie Configuration")
     ellie_config = config['ellie']
     org_value = ellie_config.get('organization', '')
-    ellie_config['organization'] = st.text_input("Organization", org_value)
+    # Normalized once here so the rest of the script can rely on the https:// prefix
+    ellie_config['organization'] = _ensure_https(st.text_input("Organization", org_value))
     ellie_config['token'] = st.text_input("Token", ellie_config.get('token', ''), type="password")
     ellie_config['api_version'] = st.text_input("API Version", ellie_config.get('api_version', 'v1'))
     ellie_config['folder_id'] = st.text_input("Default Folder ID", ellie_config.get('folder_id', ''))
 
-    if st.button("Save Settings"):
-        # Ensure organization URL has https:// prefix
-        if ellie_config['organization'] and not ellie_config['organization'].startswith(('http://', 'https://')):
-            ellie_config['organization'] = 'https://' + ellie_config['organization']
-            
-        save_config(config)
-        st.success("Settings saved successfully!")
+    if st.form_submit_button("Save Settings"):
+        if save_config(config):
+            st.success("Settings saved successfully!")
+        else:
+            st.info("No changes to save.")
 
-    if st.button("Connect"):
+    if st.form_submit_button("Connect"):
         try:
             # Validate connection settings
             if connection_mode == "Standard" and not snowflake_config.get('account'):
@@ -201,16 +301,13 @@ with st.sidebar:
                 st.error("PrivateLink URL is required for PrivateLink connection mode.")
                 raise ValueError("PrivateLink URL is required")
             
-            # Ensure organization URL has https:// prefix
-            if ellie_config['organization'] and not ellie_config['organization'].startswith(('http://', 'https://')):
-                ellie_config['organization'] = 'https://' + ellie_config['organization']
-                
-            # Connect to Snowflake
-            snowflake_connect(snowflake_config)
+            # Connect to Snowflake (the connection is cached and reused for the transfer)
+            if connect_to_snowflake(snowflake_config) is None:
+                raise ValueError("Could not connect to Snowflake")
             st.session_state.connected_to_snowflake = True
             
             # Connect to Ellie
-            ellie_connect(ellie_config)
+            st.session_state['ellie_client'] = ellie_connect(ellie_config)
             st.session_state.connected_to_ellie = True
             
             st.success("Connected to both services!")
@@ -225,11 +322,12 @@ if st.session_state.connected_to_snowflake and st.session_state.connected_to_ell
     try:
         conn = connect_to_snowflake(snowflake_config)
         if conn:
-            cursor = conn.cursor()
-            cursor.execute("SHOW SCHEMAS")
-            schemas = [row[1] for row in cursor.fetchall()]
-            cursor.close()
-            conn.close()
+            if st.button("Refresh schemas"):
+                _list_schemas.clear()
+                # Also drop the table and column metadata cached by the export
+                from ellie import refresh_cache
+                refresh_cache()
+            schemas = _list_schemas(conn, _settings_key(snowflake_config))
             
             # Schema selection
             selected_schema = st.selectbox("Select Schema", schemas)
@@ -277,27 +375,31 @@ if st.session_state.connected_to_snowflake and st.session_state.connected_to_ell
                             
                             with st.spinner("Transferring data..."):
                                 try:
-                                    # Ensure organization URL has https:// prefix again (in case it was changed)
-                                    if ellie_config['organization'] and not ellie_config['organization'].startswith(('http://', 'https://')):
-                                        ellie_config['organization'] = 'https://' + ellie_config['organization']
-                                        ellie_connect(ellie_config)
-                                        
+                                    from ellie import snowflake_export
+                                    
                                     # Export data from selected schema, passing the include_views preference
-                                    data = snowflake_export([selected_schema], include_views)
+                                    data = snowflake_export([selected_schema], include_views, connection=conn)
                                     
-                                    # Add the folderId to the model data as an integer
-                                    data['model']['folderId'] = folder_id_int
+                                    # Models are imported as physical models
+                                    model_level = "physical"
+                                    
+                                    # Set the top-level model fields in one go (folderId as an integer)
+                                    data['model'].update(folderId=folder_id_int, name=model_name, level=model_level)
                                     
                                     if debug_mode:
                                         st.subheader("API Request Data:")
                                         entity_count = len(data['model'].get('entities', []))
                                         relationship_count = len(data['model'].get('relationships', []))
                                         st.write(f"Found {entity_count} entities and {relationship_count} relationships based on foreign key constraints")
-                                        st.code(json.dumps(data, indent=2), language="json")
+                                        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+                                        # Rendering very large payloads blocks the page, offer them as a download instead
+                                        if len(payload) < DEBUG_PAYLOAD_MAX_BYTES:
+                                            st.code(payload.decode(), language="json")
+                                        else:
+                                            st.download_button("Download request JSON", payload, "request.json", mime="application/json")
                                     
                                     # Import to Ellie as physical model
-                                    model_level = "physical"
-                                    response = ellie_model_import(model_name, data, model_level)
+                                    response = st.session_state['ellie_client'].model_import(model_name, data, model_level)
                                     
                                     if debug_mode:
                                         st.subheader(f"API Response:")
@@ -5,9 +5,20 @@ This package provides functionality for connecting to Ellie.ai and transferring
 database schema information from various database systems.
 """
 
+from .ellie import EllieClient
 from .ellie import ellie_connect
 from .ellie import ellie_model_export
 from .ellie import ellie_model_import
+from .ellie import model_to_json
+from .ellie import set_default_client
+
+_SNOWFLAKE_EXPORTS = ('snowflake_connect', 'snowflake_export', 'refresh_cache')
+
+def __getattr__(name):
+    # The Snowflake connector is slow to import, so load the Snowflake
+    # functions on first access (PEP 562) instead of at package import.
+    if name in _SNOWFLAKE_EXPORTS:
+        from . import snowflake
+        return getattr(snowflake, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from .snowflake import snowflake_connect
-from .snowflake import snowflake_export
@@ -1,66 +1,175 @@
+import orjson
 import requests
+from dataclasses import dataclass, field
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 ### ELLIE
 
-ellie_settings = None
+# Client used by ellie_model_import and ellie_model_export, see set_default_client
+ellie_client = None
+
+"""
+Client for the Ellie API.
+
+Holds the API base URL and a requests.Session that carries the API token, so
+repeated calls reuse the same HTTP connection (keep-alive) instead of opening
+a new one per request.
+
+Attributes:
+    base_url (str): Ellie API base URL, e.g. 'https://org.ellie.ai/api/v1'
+    session (requests.Session): Session used for all requests to the API
+"""
+@dataclass
+class EllieClient:
+    base_url: str
+    session: requests.Session = field(default_factory=requests.Session)
+
+    """
+    Import a model exported from a database to Ellie.
+
+    This function sends the model data to Ellie API and creates a new model.
+
+    Parameters:
+        name (str): Name for the new model in Ellie
+        model (dict): Model data for creating the new model, in Ellie model format
+        level (str): Model level (conceptual, logical, or physical). Default: 'conceptual'
+
+    Returns:
+        requests.Response: Response from the Ellie API
+
+    Note:
+        The API response JSON will typically include:
+        - id: The ID of the created model
+        - success: Whether the creation was successful
+        - other metadata about the model
+    """
+    def model_import(self, name, model, level='conceptual'):
+        print(f"Creating {level} model: {name}")
+        # Callers may already have set these while building the model
+        model_info = model['model']
+        if model_info.get('name') != name or model_info.get('level') != level:
+            model_info.update(name=name, level=level)
+        return self.session.post(
+            url=f'{self.base_url}/models',
+            data=model_to_json(model),
+            headers={'Content-Type': 'application/json'}
+        )
+
+    """
+    Export a model from Ellie.
+
+    Parameters:
+        model_id (int): ID of the model to export
+
+    Returns:
+        dict: Model data in Ellie format
+    """
+    def model_export(self, model_id):
+        response = self.session.get(url=f'{self.base_url}/models/{model_id}')
+        # Parse the raw body with orjson instead of decoding it to str first
+        return orjson.loads(response.content)
+
+"""
+Serialize a model to JSON for the Ellie API.
+
+Uses orjson, which encodes large models much faster than the stdlib json module.
+
+Parameters:
+    model (dict): Model data in Ellie model format
+
+Returns:
+    bytes: UTF-8 encoded JSON
+"""
+def model_to_json(model):
+    return orjson.dumps(model, option=orjson.OPT_NON_STR_KEYS)
 
 """
 Make a new connection to Ellie.
 
-The connection settings are stored globally and used by other functions in this module.
+Creates an EllieClient for the given settings. The client is only returned, so
+each caller keeps its own instance (e.g. per Streamlit session); use
+set_default_client to make it the client of ellie_model_import and
+ellie_model_export.
 
 Parameters:
     settings (dict): Dictionary containing Ellie connection parameters:
         - organization: Ellie organization URL
         - token: Ellie API token
         - api_version: API version (default: 'v1')
-        
+
 Returns:
-    None
+    EllieClient: Client configured for the given organization
 """
 def ellie_connect(settings):
-    global ellie_settings
-    
-    if 'api_version' not in settings: 
+    if 'api_version' not in settings:
         settings['api_version'] = 'v1'
-    
-    ellie_settings = settings
+
+    return EllieClient(
+        base_url=f'''{settings['organization']}/api/{settings['api_version']}''',
+        session=_make_session(settings['organization'], settings['token'])
+    )
 
 """
-Import a model exported from a database to Ellie.
+Set the client used by ellie_model_import and ellie_model_export.
 
-This function sends the model data to Ellie API and creates a new model.
+The default client is shared by the whole process, so it is only meant for
+scripts with a single Ellie connection; the Streamlit app keeps a client per
+session instead.
 
 Parameters:
-    name (str): Name for the new model in Ellie
-    model (dict): Model data for creating the new model, in Ellie model format
-    level (str): Model level (conceptual, logical, or physical). Default: 'conceptual'
-    
-Returns:
-    requests.Response: Response from the Ellie API
-    
-Note:
-    The API response JSON will typically include:
-    - id: The ID of the created model
-    - success: Whether the creation was successful
-    - other metadata about the model
+    client (EllieClient): Client returned by ellie_connect, or None to unset it
 """
-def ellie_model_import(name, model, level='conceptual'):
-    print(f"Creating {level} model: {name}")
-    model['model']['name'] = name
-    model['model']['level'] = level
-    url = f'''{ellie_settings['organization']}/api/{ellie_settings['api_version']}/models?token={ellie_settings['token']}'''
-    return requests.post(url=url, json=model)
+def set_default_client(client):
+    global ellie_client
+    ellie_client = client
 
 """
-Export a model from Ellie.
+Create the pooled HTTP session used for an Ellie organization.
+
+Idempotent requests are retried on gateway errors (502/503/504) with a short
+backoff; model creation (POST) is never retried to avoid duplicate models.
 
 Parameters:
-    model_id (int): ID of the model to export
-    
+    organization (str): Ellie organization URL
+    token (str): Ellie API token, sent with every request
+
 Returns:
-    dict: Model data in Ellie format
+    requests.Session: Configured session
+"""
+def _make_session(organization, token):
+    session = requests.Session()
+    # The Ellie API authenticates with the token query parameter
+    session.params = {'token': token}
+
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+    session.mount(organization, adapter)
+    return session
+
+"""
+Import a model exported from a database to Ellie, using the default client.
+
+See EllieClient.model_import.
+"""
+def ellie_model_import(name, model, level='conceptual'):
+    return _default_client().model_import(name, model, level)
+
+"""
+Export a model from Ellie, using the default client.
+
+See EllieClient.model_export.
 """
 def ellie_model_export(model_id):
-    url = f'''{ellie_settings['organization']}/api/{ellie_settings['api_version']}/models/{model_id}?token={ellie_settings['token']}'''
-    return requests.get(url=url).json()
\ No newline at end of file
+    return _default_client().model_export(model_id)
+
+"""
+Return the default client, see set_default_client.
+
+Raises:
+    RuntimeError: If no default client has been set
+"""
+def _default_client():
+    if ellie_client is None:
+        raise RuntimeError("No default Ellie client, call set_default_client(ellie_connect(settings)) first")
+    return ellie_client
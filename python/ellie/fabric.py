@@ -1,12 +1,19 @@
 import pyodbc
-import struct
-from itertools import chain, repeat
-from azure.identity import InteractiveBrowserCredential
+from azure.identity import InteractiveBrowserCredential, TokenCachePersistenceOptions
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Scope of the access token used to connect to SQL databases
+SQL_TOKEN_SCOPE = "https://database.windows.net//.default"
+
+# Shared credential. Its token cache is persisted, so later connections (and runs)
+# reuse the Entra ID token until it expires instead of prompting again.
+credential = InteractiveBrowserCredential(
+    cache_persistence_options=TokenCachePersistenceOptions(name="ellie_fabric")
+)
+
 def main():
     """
     A working example code for authenticating with Azure browser integration.
@@ -17,18 +24,11 @@ def main():
     database_name = os.environ["DB_NAME"]
 
     try:
-        credential = InteractiveBrowserCredential()
-
         SQL_COPT_SS_ACCESS_TOKEN = 1256  # This connection option is defined by Microsoft in msodbcsql.h
 
-        token_bytes = credential.get_token("https://database.windows.net//.default").token.encode("UTF-16-LE")
-        token_struct = { SQL_COPT_SS_ACCESS_TOKEN: struct.pack(f'<I{len(token_bytes)}s', len(token_bytes), token_bytes) }
-
-        # token_object = credential.get_token("https://database.windows.net//.default") # Retrieve an access token valid to connect to SQL databases
-        # token_as_bytes = bytes(token_object.token, "UTF-8") # Convert the token to a UTF-8 byte string
-        # encoded_bytes = bytes(chain.from_iterable(zip(token_as_bytes, repeat(0)))) # Encode the bytes to a Windows byte string
-        # token_bytes = struct.pack("<i", len(encoded_bytes)) + encoded_bytes # Package the token into a bytes object
-        # token_struct = {SQL_COPT_SS_ACCESS_TOKEN: token_bytes}  # Attribute pointing to SQL_COPT_SS_ACCESS_TOKEN to pass access token to the driver
+        token_bytes = credential.get_token(SQL_TOKEN_SCOPE).token.encode("UTF-16-LE")
+        # The driver expects the token length as a little-endian 4 byte integer followed by the token
+        token_struct = { SQL_COPT_SS_ACCESS_TOKEN: len(token_bytes).to_bytes(4, 'little') + token_bytes }
 
         conn_str = (
             f"DRIVER={{ODBC Driver 18 for SQL Server}};"
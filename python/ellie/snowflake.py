@@ -8,12 +8,169 @@ The extracted data is formatted to match Ellie's API requirements for model impo
 """
 
 import snowflake.connector
+import logging
+import os
 import uuid
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import groupby
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
 
 ### SNOWFLAKE
 snowflake_connection = None
 
+# Index of the foreign key / primary key query method that last ran without error.
+# Tried first on later calls, so methods that don't work on this account aren't retried every time.
+_fk_method_pref = None
+_pk_method_pref = None
+
+# Seconds for which snowflake_export reuses metadata query results, see refresh_cache
+METADATA_CACHE_TTL = 60
+
+# Maximum number of metadata snapshots kept in the cache
+METADATA_CACHE_MAXSIZE = 16
+
+# Cached metadata snapshots by (connection key, schemas), as (expiry time, snapshot), oldest
+# first. Guarded by the lock because Streamlit runs each session on its own thread.
+_metadata_cache = {}
+_metadata_cache_lock = threading.Lock()
+
+# Matches full Snowflake URLs and captures the account identifier
+_ACCOUNT_URL_RE = re.compile(r'https?://([^.]+\.[^.]+\.[^.]+)\.snowflakecomputing\.com')
+
+# Method 1 for foreign keys: SHOW IMPORTED KEYS, run once per schema like SHOW TERSE OBJECTS
+# for the tables. SHOW is answered from the metadata layer without a warehouse.
+_FK_QUERY_SHOW = '''SHOW IMPORTED KEYS IN SCHEMA {schema}'''
+
+# Method 2 for foreign keys: REFERENTIAL_CONSTRAINTS view (standard INFORMATION_SCHEMA)
+_FK_QUERY_REFERENTIAL = '''
+    SELECT 
+        rc.CONSTRAINT_NAME,
+        ccu.TABLE_SCHEMA as PK_SCHEMA_NAME,
+        ccu.TABLE_NAME as PK_TABLE_NAME,
+        ccu.COLUMN_NAME as PK_COLUMN_NAME,
+        kcu.TABLE_SCHEMA as FK_SCHEMA_NAME,
+        kcu.TABLE_NAME as FK_TABLE_NAME,
+        kcu.COLUMN_NAME as FK_COLUMN_NAME
+    FROM 
+        INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
+    JOIN 
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu 
+            ON rc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME 
+            AND rc.CONSTRAINT_SCHEMA = kcu.CONSTRAINT_SCHEMA
+    JOIN 
+        INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE ccu 
+            ON rc.UNIQUE_CONSTRAINT_NAME = ccu.CONSTRAINT_NAME 
+            AND rc.UNIQUE_CONSTRAINT_SCHEMA = ccu.CONSTRAINT_SCHEMA
+    WHERE 
+        kcu.TABLE_SCHEMA IN (%s)
+    '''
+
+# Method 3 for foreign keys: direct query to the Snowflake-specific system tables
+_FK_QUERY_CONSTRAINTS = '''
+    SELECT 
+        c.constraint_name,
+        c.constraint_type,
+        t1.TABLE_SCHEMA as FK_SCHEMA_NAME,
+        t1.TABLE_NAME as FK_TABLE_NAME,
+        k1.COLUMN_NAME as FK_COLUMN_NAME,
+        t2.TABLE_SCHEMA as PK_SCHEMA_NAME,
+        t2.TABLE_NAME as PK_TABLE_NAME,
+        k2.COLUMN_NAME as PK_COLUMN_NAME
+    FROM 
+        INFORMATION_SCHEMA.TABLE_CONSTRAINTS c
+    JOIN 
+        INFORMATION_SCHEMA.CONSTRAINT_TABLE_USAGE t1 
+            ON c.constraint_name = t1.constraint_name
+    JOIN 
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE k1 
+            ON c.constraint_name = k1.constraint_name
+    JOIN 
+        INFORMATION_SCHEMA.CONSTRAINT_TABLE_USAGE t2 
+            ON c.constraint_name = t2.constraint_name 
+            AND t2.TABLE_NAME != t1.TABLE_NAME
+    JOIN 
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE k2 
+            ON t2.constraint_name = k2.constraint_name 
+            AND t2.TABLE_NAME = k2.TABLE_NAME
+    WHERE 
+        c.constraint_type = 'FOREIGN KEY' 
+        AND t1.TABLE_SCHEMA IN (%s)
+    '''
+
+# Foreign key query methods, as (name, query, whether it runs once per schema), see _run_key_query
+_FK_METHODS = (
+    ('SHOW IMPORTED KEYS', _FK_QUERY_SHOW, True),
+    ('REFERENTIAL_CONSTRAINTS', _FK_QUERY_REFERENTIAL, False),
+    ('TABLE_CONSTRAINTS', _FK_QUERY_CONSTRAINTS, False),
+)
+
+# Method 1 for primary keys: SHOW PRIMARY KEYS, run once per schema and answered from the
+# metadata layer without a warehouse
+_PK_QUERY_SHOW = '''SHOW PRIMARY KEYS IN SCHEMA {schema}'''
+
+# Method 2 for primary keys: KEY_COLUMN_USAGE
+_PK_QUERY_KEY_COLUMN_USAGE = '''
+    SELECT 
+        TABLE_SCHEMA, 
+        TABLE_NAME, 
+        COLUMN_NAME
+    FROM 
+        INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+    WHERE 
+        TABLE_SCHEMA IN (%s)
+        AND CONSTRAINT_NAME LIKE 'PRIMARY%%'
+    '''
+
+# Primary key query methods, as (name, query, whether it runs once per schema), see _run_key_query
+_PK_METHODS = (
+    ('SHOW PRIMARY KEYS', _PK_QUERY_SHOW, True),
+    ('KEY_COLUMN_USAGE', _PK_QUERY_KEY_COLUMN_USAGE, False),
+)
+
+class _KeyQueryError(Exception):
+    """
+    Raised when none of the foreign key or primary key query methods works.
+    
+    The export continues without those keys, but the incomplete metadata isn't cached.
+    """
+
+@dataclass
+class _Attribute:
+    """
+    Compact working representation of an entity attribute (a table column).
+    
+    Uses __slots__ so that large exports don't hold a pair of dicts per column;
+    converted to Ellie's nested dict format only when the model is built.
+    """
+    __slots__ = ('name', 'pk', 'fk', 'data_type')
+    
+    name: str
+    pk: bool
+    fk: bool
+    data_type: str
+    
+    def to_dict(self):
+        """
+        Convert the attribute to the format expected by Ellie's API.
+        
+        Returns:
+            dict: Attribute with name and PK/FK/DATA TYPE metadata
+        """
+        return {
+            "name": self.name,
+            "metadata": {
+                "PK": self.pk,
+                "FK": self.fk,
+                "DATA TYPE": self.data_type
+            }
+        }
+
 def extract_account_from_url(url):
     """
     Extract the account identifier from a Snowflake URL.
@@ -24,9 +181,12 @@ def extract_account_from_url(url):
     Returns:
         str: Account identifier (e.g., nn73358.eu-north-1.aws)
     """
-    # First, check if it's a URL format
-    url_pattern = r'https?://([^\.]+\.[^\.]+\.[^\.]+)\.snowflakecomputing\.com'
-    match = re.match(url_pattern, url)
+    # Bare account IDs don't need the regex at all
+    if '://' not in url:
+        return url
+    
+    # Otherwise, check if it's a Snowflake URL
+    match = _ACCOUNT_URL_RE.match(url)
     if match:
         return match.group(1)
     
@@ -71,10 +231,12 @@ def snowflake_connect(settings):
         account=account_param,
         warehouse=settings['warehouse'],
         database=settings['database'],
-        schema="INFORMATION_SCHEMA"
+        schema="INFORMATION_SCHEMA",
+        login_timeout=settings.get('login_timeout', 30),
+        client_session_keep_alive=True
     )
     
-def snowflake_export(schemas = ['PUBLIC'], include_views = True):
+def snowflake_export(schemas = ['PUBLIC'], include_views = True, connection = None):
     """
     Export schema metadata from Snowflake and format it for Ellie import.
     
@@ -82,9 +244,14 @@ def snowflake_export(schemas = ['PUBLIC'], include_views = True):
     primary keys, and foreign key relationships, then formats the data into Ellie's
     expected API structure.
     
+    Query results are reused for METADATA_CACHE_TTL seconds, so repeated exports of
+    the same schemas don't query Snowflake again. Call refresh_cache to discard them.
+    
     Args:
         schemas (list): List of schema names to export. Default: ['PUBLIC']
         include_views (bool): Whether to include views in addition to tables. Default: True
+        connection (SnowflakeConnection): Connection to query. Default: the connection
+            opened by snowflake_connect
         
     Returns:
         dict: Model data in Ellie API format with entities and relationships
@@ -92,388 +259,470 @@ def snowflake_export(schemas = ['PUBLIC'], include_views = True):
     Raises:
         Exception: If Snowflake queries fail or data processing encounters errors
     """
+    conn = connection if connection is not None else snowflake_connection
+    
+    # Metadata of repeated exports within METADATA_CACHE_TTL seconds comes from the cache
+    table_types, foreign_keys, primary_keys, schema_data = _fetch_metadata(conn, tuple(schemas))
+    
+    # The cached metadata includes views; leave them out here when they aren't exported.
+    # Their columns are skipped below along with any other table not in the list.
+    if not include_views:
+        table_types = [row for row in table_types if row['TABLE_TYPE'] != 'VIEW']
+    
+    logger.info("Found %d tables/views in schemas %s", len(table_types), ', '.join(schemas))
+    logger.info("Found %d foreign key constraints", len(foreign_keys))
+    
+    # Tables/views are identified by (schema, table) so equal names in different schemas don't clash
+    tables = {(row['TABLE_SCHEMA'], row['TABLE_NAME']) for row in table_types}
+    
+    # Nothing to model, skip processing the columns and foreign keys
+    if not tables:
+        return _build_model([], [])
+    
+    # Attributes grouped by (schema, table)
     grouped_rows = {}
     relationships = []
     
-    # Dictionary to store entity IDs
-    entity_ids = {}
+    # Index of attributes by (schema, table, column), for marking foreign key columns
+    attr_index = {}
     
-    for schema in schemas:
-        print(f"Processing schema: {schema}")
-        
-        # First, get all table and view names in this schema
-        table_types = _get_tables_and_views(schema, include_views)
-        print(f"Found {len(table_types)} tables/views in schema {schema}")
-        
-        # Skip empty schemas
-        if not table_types:
+    # Process columns and build entities. The columns are ordered by schema and table,
+    # so each table's columns are consecutive and its attribute list is built in one go.
+    for table_key, rows in groupby(schema_data, key=itemgetter(0, 1)):
+        # Skip this table/view if it's not in our filtered list
+        if table_key not in tables:
             continue
-            
-        # Extract just the table names for further processing
-        tables = [row['TABLE_NAME'] for row in table_types]
-        
-        # First, get all foreign key constraints for this schema
-        foreign_keys = _get_foreign_keys(schema)
-        print(f"Found {len(foreign_keys)} foreign key constraints in schema {schema}")
         
-        # Get table metadata including primary keys
-        schema_data = _query_schema_data(schema)
+        # Create attributes for the columns; FK is set based on foreign key constraints later
+        attributes = [
+            _Attribute(column_name, (table_schema, table_name, column_name) in primary_keys, False, data_type)
+            for table_schema, table_name, column_name, data_type in rows
+        ]
         
-        # Process columns and build entities
-        for row in schema_data:
-            table_schema = row[0]
-            table_name = row[1]
+        grouped_rows[table_key] = attributes
+        for attribute in attributes:
+            attr_index[table_key + (attribute.name,)] = attribute
+    
+    # Generate a unique ID for each entity that is emitted; the random bytes for all
+    # of them are read in one os.urandom call instead of one call per uuid4()
+    random_bytes = os.urandom(16 * len(grouped_rows))
+    entity_ids = {
+        key: str(uuid.UUID(bytes=random_bytes[i * 16:(i + 1) * 16], version=4))
+        for i, key in enumerate(grouped_rows)
+    }
+    
+    # Keep only the foreign keys between tables in our data, so the loop below
+    # doesn't look up constraints that can't produce a relationship
+    foreign_keys = [
+        fk for fk in foreign_keys
+        if (fk['fk_schema_name'], fk['fk_table_name']) in entity_ids
+        and (fk['pk_schema_name'], fk['pk_table_name']) in entity_ids
+    ]
+    
+    # Checked once, so per-relationship debug messages cost nothing when disabled
+    log_relationships = logger.isEnabledFor(logging.DEBUG)
+    
+    # Relationships already added, the metadata views can return the same constraint
+    # column more than once
+    seen_relationships = set()
+    
+    # Create relationships from foreign key constraints
+    for fk in foreign_keys:
+        try:
+            # Extract information from the foreign key constraint
+            fk_schema = fk['fk_schema_name']
+            fk_table = fk['fk_table_name']
+            fk_column = fk['fk_column_name']
+            pk_schema = fk['pk_schema_name']
+            pk_table = fk['pk_table_name']
+            pk_column = fk['pk_column_name']
+            fk_key = (fk_schema, fk_table)
+            pk_key = (pk_schema, pk_table)
             
-            # Skip this table/view if it's not in our filtered list
-            if table_name not in tables:
+            # Skip duplicate rows of a constraint that was already processed
+            relationship_key = (pk_schema, pk_table, pk_column, fk_schema, fk_table, fk_column)
+            if relationship_key in seen_relationships:
                 continue
-                
-            column_name = row[2]
-            is_pk = row[3]
-            data_type = row[4]
+            seen_relationships.add(relationship_key)
             
-            # Create attribute for this column
-            attribute = {
-                "name": column_name,
-                "metadata": {
-                    "PK": is_pk,
-                    "FK": False,  # We'll set this based on foreign key constraints later
-                    "DATA TYPE": data_type
-                }
-            }
+            # Mark the foreign key column as FK=True in its attribute
+            fk_attr = attr_index.get((fk_schema, fk_table, fk_column))
+            if fk_attr is not None:
+                fk_attr.fk = True
             
-            # Add to the grouped rows by table name
-            if table_name not in grouped_rows:
-                grouped_rows[table_name] = {"attributes": []}
-                entity_ids[table_name] = str(uuid.uuid4())  # Generate a unique ID for each entity
+            # Create a relationship following Ellie's expected format
+            relationship = {
+                "sourceEntity": {
+                    "id": entity_ids[pk_key],
+                    "name": pk_table,
+                    "startType": "one",
+                    "attributeNames": [pk_column]
+                },
+                "targetEntity": {
+                    "id": entity_ids[fk_key],
+                    "name": fk_table,
+                    "endType": "many",
+                    "attributeNames": [fk_column]
+                },
+                "description": []
+            }
             
-            grouped_rows[table_name]["attributes"].append(attribute)
-        
-        # Create relationships from foreign key constraints
-        for fk in foreign_keys:
-            try:
-                # Extract information from the foreign key constraint
-                fk_schema = fk['fk_schema_name']
-                fk_table = fk['fk_table_name']
-                fk_column = fk['fk_column_name']
-                pk_schema = fk['pk_schema_name']
-                pk_table = fk['pk_table_name']
-                pk_column = fk['pk_column_name']
-                
-                # Skip if either table is not in our filtered list
-                if fk_table not in tables or pk_table not in tables:
-                    continue
-                
-                # Mark the foreign key column as FK=True in its attribute
-                if fk_table in grouped_rows:
-                    for attr in grouped_rows[fk_table]["attributes"]:
-                        if attr["name"] == fk_column:
-                            attr["metadata"]["FK"] = True
-                
-                # Create a relationship following Ellie's expected format
-                if pk_table in entity_ids and fk_table in entity_ids:
-                    relationship = {
-                        "sourceEntity": {
-                            "id": entity_ids[pk_table],
-                            "name": pk_table,
-                            "startType": "one",
-                            "attributeNames": [pk_column]
-                        },
-                        "targetEntity": {
-                            "id": entity_ids[fk_table],
-                            "name": fk_table,
-                            "endType": "many",
-                            "attributeNames": [fk_column]
-                        },
-                        "description": []
-                    }
-                    
-                    # Add the relationship if both tables are in our data
-                    if pk_table in grouped_rows and fk_table in grouped_rows:
-                        relationships.append(relationship)
-                        print(f"Added relationship: {pk_table}.{pk_column} -> {fk_table}.{fk_column}")
-            except Exception as e:
-                print(f"Error processing foreign key constraint: {str(e)}")
+            relationships.append(relationship)
+            if log_relationships:
+                logger.debug("Added relationship: %s.%s -> %s.%s", pk_table, pk_column, fk_table, fk_column)
+        except Exception as e:
+            logger.warning("Error processing foreign key constraint: %s", e)
 
     # Create an entity for each table
     entities = [{
-        "id": entity_ids[name],
-        "name": name,
-        "attributes": grouped_rows[name]["attributes"]
-    } for name in grouped_rows.keys()]
+        "id": entity_ids[key],
+        "name": key[1],
+        "attributes": [attribute.to_dict() for attribute in attributes]
+    } for key, attributes in grouped_rows.items()]
+
+    logger.info("Created %d entities and %d relationships", len(entities), len(relationships))
+    
+    return _build_model(entities, relationships)
+
+def refresh_cache():
+    """
+    Discard cached metadata query results.
+    
+    The next snowflake_export queries Snowflake again, e.g. after tables or
+    constraints have been changed.
+    """
+    with _metadata_cache_lock:
+        _metadata_cache.clear()
+
+def _fetch_metadata(conn, schemas):
+    """
+    Fetch tables/views, foreign keys, primary keys and columns for the given schemas.
+    
+    The four results are cached together as one snapshot for METADATA_CACHE_TTL seconds,
+    per account, user, database and role rather than per connection object. Views and
+    their columns are always included, so a snapshot serves exports with and without
+    views. The results are shared between calls and must not be modified.
+    
+    When the foreign or primary keys can't be queried, the export continues without
+    them and the snapshot isn't cached, so the next export tries again.
+    
+    Args:
+        conn (SnowflakeConnection): Connection to query
+        schemas (tuple): Names of the schemas to query
+    
+    Returns:
+        tuple: (tables/views, foreign keys, primary keys, columns)
+    
+    Raises:
+        Exception: If the tables or columns query fails
+    """
+    key = ((conn.host, conn.user, conn.database, conn.role), schemas)
+    
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    
+    # Fetch everything for all schemas up front instead of issuing the same queries once
+    # per schema. The fetches are independent, so they run concurrently on their own cursors.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        tables_future = executor.submit(_get_tables_and_views, conn, schemas)
+        foreign_keys_future = executor.submit(_get_foreign_keys, conn, schemas)
+        primary_keys_future = executor.submit(_get_primary_keys, conn, schemas)
+        schema_data_future = executor.submit(_query_schema_data, conn, schemas)
+        
+        table_types = tables_future.result()
+        schema_data = schema_data_future.result()
+        complete = True
+        try:
+            foreign_keys = foreign_keys_future.result()
+        except _KeyQueryError as e:
+            logger.warning("Exporting without relationships: %s", e)
+            foreign_keys, complete = [], False
+        try:
+            primary_keys = primary_keys_future.result()
+        except _KeyQueryError as e:
+            logger.warning("Exporting without primary keys: %s", e)
+            primary_keys, complete = set(), False
+    
+    snapshot = (table_types, foreign_keys, primary_keys, schema_data)
+    if complete:
+        _store_metadata(key, snapshot)
+    return snapshot
+
+def _store_metadata(key, snapshot):
+    """
+    Add a metadata snapshot to the cache.
+    
+    Expired snapshots are dropped first, and the oldest ones are dropped when the
+    cache holds more than METADATA_CACHE_MAXSIZE snapshots.
+    
+    Args:
+        key (tuple): Cache key, see _fetch_metadata
+        snapshot (tuple): (tables/views, foreign keys, primary keys, columns)
+    """
+    now = time.monotonic()
+    with _metadata_cache_lock:
+        for expired in [k for k, (expires, _) in _metadata_cache.items() if expires <= now]:
+            del _metadata_cache[expired]
+        
+        # Re-inserted keys move to the end, so the first entry is always the oldest
+        _metadata_cache.pop(key, None)
+        while len(_metadata_cache) >= METADATA_CACHE_MAXSIZE:
+            del _metadata_cache[next(iter(_metadata_cache))]
+        
+        _metadata_cache[key] = (now + METADATA_CACHE_TTL, snapshot)
 
-    print(f"Created {len(entities)} entities and {len(relationships)} relationships")
+def _build_model(entities, relationships):
+    """
+    Wrap entities and relationships in the Ellie model format.
     
-    # Generate the JSON schema
-    model = {
+    Args:
+        entities (list): Entity dictionaries
+        relationships (list): Relationship dictionaries
+    
+    Returns:
+        dict: Model data in Ellie API format
+    """
+    return {
         "model": {
             "level": "conceptual",
             "entities": entities,
             "relationships": relationships
         }
     }
-    return model
 
-def _get_tables_and_views(schema_name, include_views=True):
+def _get_tables_and_views(conn, schemas):
     """
-    Get a list of all tables and optionally views in the specified schema.
+    Get a list of all tables and views in the specified schemas.
+    
+    SHOW TERSE OBJECTS is tried first: it is answered from the metadata layer and
+    doesn't need a running warehouse. INFORMATION_SCHEMA.TABLES is the fallback.
     
     Args:
-        schema_name (str): Name of the schema to query
-        include_views (bool): Whether to include views in addition to tables
+        conn (SnowflakeConnection): Connection to query
+        schemas (list): Names of the schemas to query
     
     Returns:
-        list: List of dictionaries containing table/view information
+        list: List of dictionaries with TABLE_SCHEMA, TABLE_NAME and TABLE_TYPE keys
         
     Raises:
         Exception: If Snowflake queries fail
     """
-    global snowflake_connection
-    
-    with snowflake_connection.cursor(snowflake.connector.DictCursor) as cur:
+    with conn.cursor(snowflake.connector.DictCursor) as cur:
+        # Method 1: SHOW TERSE OBJECTS lists tables and views, with the type in the kind column
         try:
-            # Build SQL query based on whether to include views
-            if include_views:
-                table_type_filter = "('BASE TABLE', 'VIEW')"
-            else:
-                table_type_filter = "('BASE TABLE')"
-                
-            # Query INFORMATION_SCHEMA.TABLES
-            cur.execute(f'''
+            tables = []
+            for schema in schemas:
+                cur.execute(f'''SHOW TERSE OBJECTS IN SCHEMA {_quote_identifier(schema)}''')
+                for t in cur:
+                    kind = t.get('kind', '').upper()
+                    if kind in ('TABLE', 'VIEW'):
+                        tables.append({
+                            'TABLE_SCHEMA': t.get('schema_name', schema),
+                            'TABLE_NAME': t.get('name', ''),
+                            'TABLE_TYPE': 'VIEW' if kind == 'VIEW' else 'BASE TABLE'
+                        })
+            return tables
+        except Exception as e:
+            logger.warning("Error fetching tables with SHOW OBJECTS: %s", e)
+        
+        # Method 2: INFORMATION_SCHEMA.TABLES
+        try:
+            cur.execute('''
                 SELECT 
+                    TABLE_SCHEMA,
                     TABLE_NAME,
                     TABLE_TYPE
                 FROM 
                     INFORMATION_SCHEMA.TABLES
                 WHERE 
-                    TABLE_SCHEMA = '{schema_name}'
-                    AND TABLE_TYPE IN {table_type_filter}
-            ''')
-            tables = cur.fetchall()
-            
-            # If no results, try fallback method with SHOW TABLES
-            if not tables:
-                try:
-                    # SHOW TABLES doesn't have a filter for table type,
-                    # so we'll need to filter the results afterwards
-                    cur.execute(f'''SHOW TABLES IN SCHEMA {schema_name}''')
-                    all_tables = cur.fetchall()
-                    
-                    # Filter based on kind column (TABLE or VIEW)
-                    if include_views:
-                        tables = all_tables
-                    else:
-                        tables = [t for t in all_tables if t.get('kind', '').upper() == 'TABLE']
-                        
-                except Exception as e:
-                    print(f"Error fetching tables with SHOW TABLES: {str(e)}")
-            
-            return tables
+                    TABLE_SCHEMA IN (%s)
+                    AND TABLE_TYPE IN ('BASE TABLE', 'VIEW')
+            ''', (list(schemas),))
+            return cur.fetchall()
             
         except Exception as e:
-            print(f"Error fetching tables: {str(e)}")
-            return []
+            logger.error("Error fetching tables: %s", e)
+            raise
 
-def _query_tables(schemas):
+def _query_tables(conn, schemas):
     """
     Query all tables in the given schemas.
     
     Args:
+        conn (SnowflakeConnection): Connection to query
         schemas (list): List of schema names to query
         
     Returns:
         list: List of tuples containing (TABLE_SCHEMA, TABLE_NAME)
     """
-    global snowflake_connection
-    
-    joined_schemas = _join_schemas(schemas)
-
-    with snowflake_connection.cursor() as cur:
-        cur.execute(f'''
+    with conn.cursor() as cur:
+        cur.execute('''
             SELECT TABLE_SCHEMA,
                 TABLE_NAME
             FROM TABLES
-            WHERE TABLE_SCHEMA IN ({joined_schemas})
+            WHERE TABLE_SCHEMA IN (%s)
             ORDER BY TABLE_NAME;
-        ''')
+        ''', (list(schemas),))
         tables = cur.fetchall()
     return tables 
 
-def _get_foreign_keys(schema_name):
+def _get_foreign_keys(conn, schemas):
     """
-    Query all foreign key constraints in a schema from Snowflake's metadata.
+    Query all foreign key constraints in the given schemas from Snowflake's metadata.
     
-    This function tries multiple methods to retrieve foreign key information
-    since different Snowflake versions and editions support different metadata views.
+    Only the given schemas are queried, never the whole database. This function tries
+    multiple methods to retrieve foreign key information since different Snowflake
+    versions and editions support different metadata views. The warehouse-free
+    SHOW IMPORTED KEYS is tried first.
     
     Args:
-        schema_name (str): Name of the schema to query foreign keys for
+        conn (SnowflakeConnection): Connection to query
+        schemas (list): Names of the schemas to query foreign keys for
         
     Returns:
-        list: List of dictionaries containing foreign key constraint information
+        list: List of dictionaries containing foreign key constraint information,
+            with lowercase keys (fk_schema_name, fk_table_name, fk_column_name,
+            pk_schema_name, pk_table_name, pk_column_name)
         
     Raises:
-        Exception: If all foreign key query methods fail
+        _KeyQueryError: If all foreign key query methods fail
     """
-    global snowflake_connection
+    global _fk_method_pref
     
     foreign_keys = []
     
-    # Try different approaches to get foreign key information
-    methods = [
-        # Method 1: REFERENTIAL_CONSTRAINTS view (standard INFORMATION_SCHEMA)
-        f'''
-        SELECT 
-            rc.CONSTRAINT_NAME,
-            ccu.TABLE_SCHEMA as PK_SCHEMA_NAME,
-            ccu.TABLE_NAME as PK_TABLE_NAME,
-            ccu.COLUMN_NAME as PK_COLUMN_NAME,
-            kcu.TABLE_SCHEMA as FK_SCHEMA_NAME,
-            kcu.TABLE_NAME as FK_TABLE_NAME,
-            kcu.COLUMN_NAME as FK_COLUMN_NAME
-        FROM 
-            INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
-        JOIN 
-            INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu 
-                ON rc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME 
-                AND rc.CONSTRAINT_SCHEMA = kcu.CONSTRAINT_SCHEMA
-        JOIN 
-            INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE ccu 
-                ON rc.UNIQUE_CONSTRAINT_NAME = ccu.CONSTRAINT_NAME 
-                AND rc.UNIQUE_CONSTRAINT_SCHEMA = ccu.CONSTRAINT_SCHEMA
-        WHERE 
-            kcu.TABLE_SCHEMA = '{schema_name}'
-        ''',
-        
-        # Method 2: Direct query to the Snowflake-specific system tables
-        f'''
-        SELECT 
-            c.constraint_name,
-            c.constraint_type,
-            t1.TABLE_SCHEMA as FK_SCHEMA_NAME,
-            t1.TABLE_NAME as FK_TABLE_NAME,
-            k1.COLUMN_NAME as FK_COLUMN_NAME,
-            t2.TABLE_SCHEMA as PK_SCHEMA_NAME,
-            t2.TABLE_NAME as PK_TABLE_NAME,
-            k2.COLUMN_NAME as PK_COLUMN_NAME
-        FROM 
-            INFORMATION_SCHEMA.TABLE_CONSTRAINTS c
-        JOIN 
-            INFORMATION_SCHEMA.CONSTRAINT_TABLE_USAGE t1 
-                ON c.constraint_name = t1.constraint_name
-        JOIN 
-            INFORMATION_SCHEMA.KEY_COLUMN_USAGE k1 
-                ON c.constraint_name = k1.constraint_name
-        JOIN 
-            INFORMATION_SCHEMA.CONSTRAINT_TABLE_USAGE t2 
-                ON c.constraint_name = t2.constraint_name 
-                AND t2.TABLE_NAME != t1.TABLE_NAME
-        JOIN 
-            INFORMATION_SCHEMA.KEY_COLUMN_USAGE k2 
-                ON t2.constraint_name = k2.constraint_name 
-                AND t2.TABLE_NAME = k2.TABLE_NAME
-        WHERE 
-            c.constraint_type = 'FOREIGN KEY' 
-            AND t1.TABLE_SCHEMA = '{schema_name}'
-        ''',
-        
-        # Method 3: Use SHOW IMPORTED KEYS command
-        f'''SHOW IMPORTED KEYS IN {schema_name}.*;'''
-    ]
-    
-    # Try each method until we get results
-    for i, query in enumerate(methods):
-        try:
-            print(f"Trying foreign key query method {i+1}...")
-            with snowflake_connection.cursor(snowflake.connector.DictCursor) as cur:
-                cur.execute(query)
-                results = cur.fetchall()
-                
-                if results:
-                    print(f"Method {i+1} successful, found {len(results)} foreign keys.")
-                    
-                    # Handle SHOW IMPORTED KEYS special case (different column names)
-                    if i == 2:  # Method 3
-                        # Map the column names from SHOW IMPORTED KEYS to our standard format
-                        foreign_keys = [{
-                            'fk_schema_name': row.get('FK_DATABASE_NAME', row.get('fk_schema_name', '')),
-                            'fk_table_name': row.get('FK_TABLE_NAME', row.get('fk_table_name', '')),
-                            'fk_column_name': row.get('FK_COLUMN_NAME', row.get('fk_column_name', '')),
-                            'pk_schema_name': row.get('PK_DATABASE_NAME', row.get('pk_schema_name', '')),
-                            'pk_table_name': row.get('PK_TABLE_NAME', row.get('pk_table_name', '')),
-                            'pk_column_name': row.get('PK_COLUMN_NAME', row.get('pk_column_name', ''))
-                        } for row in results]
-                    else:
-                        foreign_keys = results
-                    
-                    # We found results, no need to try other methods
-                    break
-        except Exception as e:
-            print(f"Foreign key query method {i+1} failed: {str(e)}")
+    # One cursor serves all methods; a failed execute leaves it usable for the next
+    with conn.cursor(snowflake.connector.DictCursor) as cur:
+        # Try each method until one runs, starting with the one that worked last time. An
+        # empty result is valid (schemas without foreign keys), only errors fall back.
+        for i in _method_order(len(_FK_METHODS), _fk_method_pref):
+            name, query, per_schema = _FK_METHODS[i]
+            try:
+                logger.debug("Trying foreign key query with %s...", name)
+                results = _run_key_query(cur, query, per_schema, schemas)
+            except Exception as e:
+                logger.warning("Foreign key query with %s failed: %s", name, e)
+                continue
+            
+            logger.debug("Foreign key query with %s found %d foreign keys", name, len(results))
+            
+            # Snowflake returns the column aliases of methods 2 and 3 in upper case,
+            # while SHOW IMPORTED KEYS uses lower case; normalize to lower case
+            foreign_keys = [{
+                'fk_schema_name': row.get('FK_SCHEMA_NAME', row.get('fk_schema_name', '')),
+                'fk_table_name': row.get('FK_TABLE_NAME', row.get('fk_table_name', '')),
+                'fk_column_name': row.get('FK_COLUMN_NAME', row.get('fk_column_name', '')),
+                'pk_schema_name': row.get('PK_SCHEMA_NAME', row.get('pk_schema_name', '')),
+                'pk_table_name': row.get('PK_TABLE_NAME', row.get('pk_table_name', '')),
+                'pk_column_name': row.get('PK_COLUMN_NAME', row.get('pk_column_name', ''))
+            } for row in results]
+            
+            # The method works on this account, no need to try other methods
+            _fk_method_pref = i
+            break
+        else:
+            raise _KeyQueryError("All foreign key query methods failed")
     
     return foreign_keys
 
-def _query_schema_data(schema_name):
+def _get_primary_keys(conn, schemas):
     """
-    Query schema data including tables, columns, and primary keys.
+    Query the primary key columns in the given schemas.
     
     Args:
-        schema_name (str): Name of the schema to query
+        conn (SnowflakeConnection): Connection to query
+        schemas (list): Names of the schemas to query
         
     Returns:
-        list: List of tuples containing (schema_name, table_name, column_name, is_pk, data_type)
+        set: (schema_name, table_name, column_name) tuples of primary key columns
         
     Raises:
-        Exception: If Snowflake queries fail
+        _KeyQueryError: If all primary key query methods fail
     """
-    global snowflake_connection
+    global _pk_method_pref
     
-    # Query primary keys
-    primary_keys = {}
+    primary_keys = set()
     
-    try:
-        print(f"Fetching primary keys for schema: {schema_name}")
-        with snowflake_connection.cursor(snowflake.connector.DictCursor) as cur:
-            # Method 1: Use KEY_COLUMN_USAGE
+    logger.debug("Fetching primary keys for schemas: %s", ', '.join(schemas))
+    with conn.cursor(snowflake.connector.DictCursor) as cur:
+        # Try each method until one runs, starting with the one that worked last time.
+        # An empty result is valid (tables without primary keys), only errors fall back.
+        for i in _method_order(len(_PK_METHODS), _pk_method_pref):
+            name, query, per_schema = _PK_METHODS[i]
             try:
-                cur.execute(f'''
-                    SELECT 
-                        TABLE_SCHEMA, 
-                        TABLE_NAME, 
-                        COLUMN_NAME
-                    FROM 
-                        INFORMATION_SCHEMA.KEY_COLUMN_USAGE
-                    WHERE 
-                        TABLE_SCHEMA = '{schema_name}'
-                        AND CONSTRAINT_NAME LIKE 'PRIMARY%'
-                ''')
-                for row in cur.fetchall():
-                    key = (row['TABLE_SCHEMA'], row['TABLE_NAME'], row['COLUMN_NAME'])
-                    primary_keys[key] = True
+                logger.debug("Trying primary key query with %s...", name)
+                rows = _run_key_query(cur, query, per_schema, schemas)
             except Exception as e:
-                print(f"Primary key query with KEY_COLUMN_USAGE failed: {str(e)}")
+                logger.warning("Primary key query with %s failed: %s", name, e)
+                continue
+            
+            logger.debug("Primary key query with %s found %d primary keys", name, len(rows))
+            
+            # SHOW PRIMARY KEYS uses lower case column names
+            primary_keys = {(
+                row.get('TABLE_SCHEMA', row.get('schema_name', '')),
+                row.get('TABLE_NAME', row.get('table_name', '')),
+                row.get('COLUMN_NAME', row.get('column_name', ''))
+            ) for row in rows}
             
-            # If we didn't get any results, try Method 2: SHOW PRIMARY KEYS
-            if not primary_keys:
-                try:
-                    cur.execute(f'''SHOW PRIMARY KEYS IN {schema_name}.*;''')
-                    for row in cur.fetchall():
-                        pk_schema = row.get('schema_name', '')
-                        pk_table = row.get('table_name', '')
-                        pk_column = row.get('column_name', '')
-                        key = (pk_schema, pk_table, pk_column)
-                        primary_keys[key] = True
-                except Exception as e:
-                    print(f"Primary key query with SHOW PRIMARY KEYS failed: {str(e)}")
-    except Exception as e:
-        print(f"Error fetching primary keys: {str(e)}")
-    
-    print(f"Found {len(primary_keys)} primary keys")
-    
-    # Query all columns and tag as primary key if applicable
-    result = []
-    with snowflake_connection.cursor() as cur:
-        cur.execute(f'''
+            _pk_method_pref = i
+            break
+        else:
+            raise _KeyQueryError("All primary key query methods failed")
+    
+    logger.info("Found %d primary keys", len(primary_keys))
+    return primary_keys
+
+def _run_key_query(cur, query, per_schema, schemas):
+    """
+    Run a key query method for the given schemas.
+    
+    SHOW commands can't bind parameters and cover a single schema, so they are run
+    once per schema with the quoted schema name filled in. INFORMATION_SCHEMA queries
+    bind the list of schemas and cover all of them at once.
+    
+    Args:
+        cur (DictCursor): Cursor to run the query on
+        query (str): Query with a {schema} placeholder (per schema) or an IN (%s) filter
+        per_schema (bool): Whether the query is run once per schema
+        schemas (list): Names of the schemas to query
+    
+    Returns:
+        list: Result rows as dictionaries
+    """
+    if not per_schema:
+        cur.execute(query, (list(schemas),))
+        return cur.fetchall()
+    
+    rows = []
+    for schema in schemas:
+        cur.execute(query.format(schema=_quote_identifier(schema)))
+        rows.extend(cur.fetchall())
+    return rows
+
+def _query_schema_data(conn, schemas):
+    """
+    Query the columns of all tables and views in the given schemas.
+    
+    All schemas are covered by a single query, so the cost doesn't grow with the
+    number of schemas.
+    
+    Args:
+        conn (SnowflakeConnection): Connection to query
+        schemas (list): Names of the schemas to query
+        
+    Returns:
+        list: List of tuples containing (schema_name, table_name, column_name, data_type),
+            ordered by schema, table and column position
+        
+    Raises:
+        Exception: If Snowflake queries fail
+    """
+    # Query all columns
+    with conn.cursor() as cur:
+        cur.execute('''
             SELECT 
                 TABLE_SCHEMA,
                 TABLE_NAME,
@@ -482,44 +731,42 @@ def _query_schema_data(schema_name):
             FROM 
                 INFORMATION_SCHEMA.COLUMNS
             WHERE 
-                TABLE_SCHEMA = '{schema_name}'
+                TABLE_SCHEMA IN (%s)
             ORDER BY 
-                TABLE_NAME, ORDINAL_POSITION;
-        ''')
+                TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION;
+        ''', (list(schemas),))
         
-        for row in cur.fetchall():
-            table_schema = row[0]
-            table_name = row[1]
-            column_name = row[2]
-            data_type = row[3]
-            
-            # Check if this column is a primary key
-            is_pk = primary_keys.get((table_schema, table_name, column_name), False)
-            
-            # Build the result row
-            result_row = [
-                table_schema,
-                table_name,
-                column_name,
-                is_pk,
-                data_type
-            ]
-            
-            result.append(result_row)
+        result = list(cur)
     
-    print(f"Total columns: {len(result)}")
-    print(f"Total PK columns: {sum(1 for r in result if r[3])}")
+    logger.info("Total columns: %d", len(result))
     
     return result
 
-def _join_schemas(schemas):
+def _method_order(count, preferred):
+    """
+    Order in which to try a list of alternative query methods.
+    
+    Args:
+        count (int): Number of methods
+        preferred (int): Index of the method to try first, or None to keep the default order
+        
+    Returns:
+        list: Method indices, with the preferred method first
+    """
+    order = list(range(count))
+    if preferred is not None:
+        order.remove(preferred)
+        order.insert(0, preferred)
+    return order
+
+def _quote_identifier(name):
     """
-    Join schema names for use in SQL IN clause.
+    Quote an identifier (e.g. a schema name) for use in SQL.
     
     Args:
-        schemas (list): List of schema names
+        name (str): Identifier as returned by Snowflake (case preserved)
         
     Returns:
-        str: Comma-separated, quoted schema names for SQL
+        str: Double-quoted identifier with embedded quotes escaped
     """
-    return ', '.join(f"'{k}'" for k in schemas)
+    return '"' + name.replace('"', '""') + '"'
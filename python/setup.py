@@ -14,5 +14,6 @@ setup(name='ellie',
       install_requires=[
         'snowflake-connector-python>=3.0.3',
         'requests>=2.31.0',
+        'orjson>=3.9.0',
       ]
 )